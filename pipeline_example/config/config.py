@@ -27,7 +27,8 @@ GFS_FILE_TEMPLATE = "gfs.t{cycle}z.pgrb2.0p25.f{forecast_hour:03d}"
 GFS_VARIABLES = [
     'UGRD:100 m above ground',  # U-component of wind at 100m
     'VGRD:100 m above ground',  # V-component of wind at 100m
-    'TMP:2 m above ground'      # Temperature at 2m
+    'TMP:2 m above ground',     # Temperature at 2m
+    'PRES:surface'              # Surface pressure (air density)
 ]
 
 # Database settings
@@ -89,9 +90,11 @@ def build_grib_filter_url(date_str, cycle, forecast_hour):
         'file': GFS_FILE_TEMPLATE.format(cycle=cycle, forecast_hour=forecast_hour),
         'lev_100_m_above_ground': 'on',
         'lev_2_m_above_ground': 'on',
+        'lev_surface': 'on',
         'var_TMP': 'on',
         'var_UGRD': 'on',
         'var_VGRD': 'on',
+        'var_PRES': 'on',
         'subregion': '',
         'leftlon': str(EUROPE_BOUNDS['lon_min']),
         'rightlon': str(EUROPE_BOUNDS['lon_max']),
@@ -1,21 +1,37 @@
 # src/analysis.py
-import fiona
 import geopandas as gpd
-world = gpd.read_file("data/geospatial/ne_110m_admin_0_countries/ne_110m_admin_0_countries.shp")
-
 import sqlite3
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # headless backend; avoids GUI toolkit overhead
 import matplotlib.pyplot as plt
-import cartopy.crs as ccrs
-import cartopy.feature as cfeature
 import numpy as np
-from shapely.geometry import Point
 import argparse
+import functools
+from datetime import date, datetime
 import os
+import pickle
 from pathlib import Path
 import requests
 import zipfile
 
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _gather_country_ids(lats, lons, lat0, lon0, lat_res, lon_res, raster):
+        """Map each (lat, lon) to its country id with one fused index+gather pass."""
+        height = raster.shape[0]
+        out = np.empty(lats.size, dtype=np.int32)
+        for k in prange(lats.size):
+            i = height - 1 - int(round((lats[k] - lat0) / lat_res))
+            j = int(round((lons[k] - lon0) / lon_res))
+            out[k] = raster[i, j]
+        return out
+
 def download_natural_earth(data_dir="data/geospatial"):
     """Downloads and extracts the Natural Earth dataset if not present."""
     data_dir = Path(data_dir)
@@ -50,7 +66,159 @@ def download_natural_earth(data_dir="data/geospatial"):
     except Exception as e:
         print(f"Failed to download or process Natural Earth dataset: {e}")
         return None
-def main(date_str, cycle_str):
+# Plot extent shared by set_extent and the cached feature clipping
+MAP_EXTENT = [-10, 40, 35, 70]
+
+
+def load_map_features(cache_path="data/geospatial/cartopy_features.pkl"):
+    """Load the map background geometries clipped to MAP_EXTENT.
+
+    cartopy's named features re-read and clip the Natural Earth shapefiles
+    in every process; here the clipped geometries are pickled once and
+    reloaded on later runs. Returns (feature, style) pairs ready for
+    ax.add_feature.
+    """
+    import cartopy.crs as ccrs
+    import cartopy.feature as cfeature
+    from shapely.geometry import box
+
+    # Insertion order doubles as drawing order: fills first, lines on top
+    styles = {
+        'ocean': {'facecolor': cfeature.COLORS['water']},
+        'land': {'facecolor': cfeature.COLORS['land'], 'edgecolor': 'black'},
+        'coastline': {'facecolor': 'none', 'edgecolor': 'black'},
+        'borders': {'facecolor': 'none', 'edgecolor': 'black', 'linestyle': ':'},
+    }
+
+    cache_path = Path(cache_path)
+    if cache_path.exists():
+        with open(cache_path, 'rb') as f:
+            geoms = pickle.load(f)
+    else:
+        clip = box(MAP_EXTENT[0], MAP_EXTENT[2], MAP_EXTENT[1], MAP_EXTENT[3])
+        sources = {
+            'coastline': cfeature.COASTLINE,
+            'borders': cfeature.BORDERS,
+            'land': cfeature.LAND,
+            'ocean': cfeature.OCEAN,
+        }
+        geoms = {name: [geom.intersection(clip) for geom in feat.geometries()
+                        if geom.intersects(clip)]
+                 for name, feat in sources.items()}
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, 'wb') as f:
+            pickle.dump(geoms, f)
+
+    return [(cfeature.ShapelyFeature(geoms[name], ccrs.PlateCarree()), style)
+            for name, style in styles.items()]
+
+
+@functools.lru_cache(maxsize=1)
+def load_world(data_dir="data/geospatial"):
+    """Load the Natural Earth countries layer, cached as GeoParquet.
+
+    The shapefile is converted to GeoParquet on first use; later runs read
+    the columnar file instead, decoding only the columns the country
+    ranking needs.
+    """
+    data_dir = Path(data_dir)
+    parquet_path = data_dir / "world.parquet"
+    if parquet_path.exists():
+        return gpd.read_parquet(parquet_path, columns=['name', 'iso_a3', 'geometry'])
+
+    world = gpd.read_file(data_dir / "ne_110m_admin_0_countries" / "ne_110m_admin_0_countries.shp")
+    try:
+        world.to_parquet(parquet_path)
+    except ImportError:
+        print("pyarrow not available. Skipping GeoParquet cache for the world layer.")
+    return world
+
+
+def rank_countries_gpu(points_gdf, countries_gdf):
+    """Assign grid points to countries on the GPU and average WPD per country.
+
+    Uses cuSpatial's quadtree point-in-polygon join, keeping the whole
+    reduction on-device via cuDF. Requires a CUDA GPU with cuspatial/cudf
+    installed; raises ImportError otherwise so the caller can fall back.
+    """
+    import cudf
+    import cuspatial
+
+    points = cuspatial.GeoSeries.from_geopandas(points_gdf.geometry)
+    polygons = cuspatial.GeoSeries.from_geopandas(countries_gdf.geometry)
+
+    x_min, y_min, x_max, y_max = countries_gdf.total_bounds
+    max_depth = 15
+    max_size = 128
+    scale = max(x_max - x_min, y_max - y_min) / (1 << max_depth)
+
+    point_indices, quadtree = cuspatial.quadtree_on_points(
+        points, x_min, x_max, y_min, y_max, scale, max_depth, max_size)
+    poly_bboxes = cuspatial.polygon_bounding_boxes(polygons)
+    intersections = cuspatial.join_quadtree_and_bounding_boxes(
+        quadtree, poly_bboxes, x_min, x_max, y_min, y_max, scale, max_depth)
+    pairs = cuspatial.quadtree_point_in_polygon(
+        intersections, quadtree, point_indices, points, polygons)
+
+    # Map quadtree-local point indices back to the original row order
+    point_idx = point_indices.take(pairs['point_index']).reset_index(drop=True)
+    poly_idx = pairs['polygon_index'].reset_index(drop=True)
+
+    joined = cudf.DataFrame({
+        'name': cudf.Series.from_pandas(countries_gdf['name']).take(poly_idx).reset_index(drop=True),
+        'wind_power_density': cudf.Series(points_gdf['wind_power_density'].to_numpy()).take(point_idx).reset_index(drop=True),
+    })
+    country_avg = joined.groupby('name')['wind_power_density'].mean().reset_index()
+    return country_avg.to_pandas()
+
+
+def rank_countries_raster(total_avg_wpd, countries_gdf):
+    """Assign grid points to countries by rasterizing the country polygons.
+
+    GFS points sit on a regular lat/lon grid, so instead of one
+    point-in-polygon test per point the polygons are scanline-filled onto
+    the grid once and each point looks up its country by (row, col).
+    Requires rasterio; raises ImportError otherwise so the caller can fall
+    back to the spatial join.
+    """
+    import rasterio.features
+    import rasterio.transform
+
+    unique_lats = np.sort(total_avg_wpd['lat'].unique())
+    unique_lons = np.sort(total_avg_wpd['lon'].unique())
+    lat_res = unique_lats[1] - unique_lats[0]
+    lon_res = unique_lons[1] - unique_lons[0]
+    height, width = unique_lats.size, unique_lons.size
+
+    # Pixel edges sit half a cell beyond the outermost grid points
+    transform = rasterio.transform.from_origin(unique_lons[0] - lon_res / 2,
+                                               unique_lats[-1] + lat_res / 2,
+                                               lon_res, lat_res)
+    country_raster = rasterio.features.rasterize(
+        ((geom, idx) for idx, geom in enumerate(countries_gdf.geometry)),
+        out_shape=(height, width), transform=transform, fill=-1, dtype='int32')
+
+    # Row 0 of the raster is the northernmost latitude; on a regular grid the
+    # (row, col) of a point is plain arithmetic, no binary search needed.
+    lats = total_avg_wpd['lat'].to_numpy(dtype=np.float64)
+    lons = total_avg_wpd['lon'].to_numpy(dtype=np.float64)
+    if njit is not None:
+        country_ids = _gather_country_ids(lats, lons, unique_lats[0], unique_lons[0],
+                                          lat_res, lon_res, country_raster)
+    else:
+        row_idx = height - 1 - np.rint((lats - unique_lats[0]) / lat_res).astype(np.intp)
+        col_idx = np.rint((lons - unique_lons[0]) / lon_res).astype(np.intp)
+        country_ids = country_raster[row_idx, col_idx]
+
+    inside = country_ids >= 0
+    grouped = total_avg_wpd.loc[inside].groupby(country_ids[inside])['wind_power_density'].mean()
+    return pd.DataFrame({
+        'name': countries_gdf['name'].to_numpy()[grouped.index.to_numpy()],
+        'wind_power_density': grouped.to_numpy(),
+    })
+
+
+def main(date_str, cycle_str, use_gpu=False):
     """Main function to perform analysis."""
     db_path = "data/processed/gfs_data.db"
     if not os.path.exists(db_path):
@@ -58,108 +226,209 @@ def main(date_str, cycle_str):
         return
 
     # --- 1. Data Loading ---
+    # With pyarrow installed, rows land directly in Arrow columnar buffers
+    # instead of going through an intermediate object/BlockManager copy.
+    try:
+        import pyarrow  # noqa: F401
+        read_kwargs = {'dtype_backend': 'pyarrow'}
+    except ImportError:
+        read_kwargs = {}
+
+    # One connection for the whole run: the statement cache stays warm and
+    # the page cache is not flushed between the load and the save.
     con = sqlite3.connect(db_path)
-    query = f"SELECT lat, lon, wind_power_density, forecast_hour FROM gfs_forecasts WHERE forecast_date = '{date_str}' AND cycle = '{cycle_str}'"
-    gfs_data = pd.read_sql_query(query, con)
-    con.close()
+    con.execute("PRAGMA journal_mode=WAL")
+    try:
+        query = ("SELECT lat, lon, wind_power_density, forecast_hour FROM gfs_forecasts "
+                 "WHERE forecast_date = ? AND cycle = ?")
+        gfs_data = pd.read_sql_query(query, con, params=(date_str, cycle_str), **read_kwargs)
 
-    if gfs_data.empty:
-        print("No data found in the database for the specified date and cycle.")
-        return
+        if gfs_data.empty:
+            print("No data found in the database for the specified date and cycle.")
+            return
 
-    # --- 2. Data Preparation ---
-    gfs_data['run_date'] = pd.to_datetime(date_str, format='%Y%m%d')
-    gfs_data['forecast_datetime'] = gfs_data['run_date'] + pd.to_timedelta(gfs_data['forecast_hour'], unit='h')
-    gfs_data['forecast_day'] = gfs_data['forecast_datetime'].dt.date
-
-    # --- 3. Visualize Daily Average Wind Power Density ---
-    daily_avg_wpd = gfs_data.groupby(['lat', 'lon', 'forecast_day'])['wind_power_density'].mean().reset_index()
-
-    # Get European country boundaries
-    #world_shapefile = download_natural_earth()
-    #if world_shapefile is None:
-    #    print("Could not load map data. Aborting visualization.")
-    #    return
-    #world = gpd.read_file("data/geospatial/ne_110m_admin_0_countries/ne_110m_admin_0_countries.shp")
-    #world = gpd.read_file("data/geospatial/ne_110m_admin_0_countries/ne_110m_admin_0_countries.shp")
-    #europe = world[world.continent == 'Europe']
-
-    # Create faceted plot
-    unique_days = sorted(daily_avg_wpd['forecast_day'].unique())
-    proj = ccrs.LambertConformal(central_longitude=10.0, central_latitude=52.0)
-    fig, axes = plt.subplots(1, len(unique_days), figsize=(20, 10), subplot_kw={'projection': proj})
-    if len(unique_days) == 1:
-        axes = [axes]
-
-    for i, day in enumerate(unique_days):
-        ax = axes[i]
-        day_data = daily_avg_wpd[daily_avg_wpd['forecast_day'] == day]
-
-        ax.set_extent([-10, 40, 35, 70], crs=ccrs.PlateCarree())
-        ax.add_feature(cfeature.COASTLINE)
-        ax.add_feature(cfeature.BORDERS, linestyle=':')
-        ax.add_feature(cfeature.LAND, edgecolor='black')
-        ax.add_feature(cfeature.OCEAN)
-        ax.gridlines(draw_labels=True, dms=True, x_inline=False, y_inline=False)
-
-        contour = ax.tricontourf(day_data['lon'], day_data['lat'], day_data['wind_power_density'],
-                                 transform=ccrs.PlateCarree(), cmap='viridis', levels=15)
-
-        ax.set_title(f"Forecast Day: {day.strftime('%Y-%m-%d')}")
-
-    fig.colorbar(contour, ax=axes, orientation='horizontal', fraction=0.05, pad=0.1, label="Wind Power Density (W/m²)")
-    plt.suptitle(f"Daily Average Wind Power Density (GFS Run: {date_str} Cycle {cycle_str})", fontsize=16)
-    plt.tight_layout(rect=[0, 0.05, 1, 0.96])
-
-    output_dir = Path("data/processed/plots")
-    output_dir.mkdir(parents=True, exist_ok=True)
-    plot_path = output_dir / f"wpd_map_faceted_{date_str}_{cycle_str}.png"
-    plt.savefig(plot_path)
-    print(f"Successfully generated and saved faceted wind power density map to {plot_path}")
-
-    # --- 4. Country Ranking ---
-    total_avg_wpd = gfs_data.groupby(['lat', 'lon'])['wind_power_density'].mean().reset_index()
-    world = gpd.read_file("data/geospatial/ne_110m_admin_0_countries/ne_110m_admin_0_countries.shp")
-    
-    geometry = [Point(xy) for xy in zip(total_avg_wpd.lon, total_avg_wpd.lat)]
-    points_gdf = gpd.GeoDataFrame(total_avg_wpd, crs="EPSG:4326", geometry=geometry)
+        # Deferred so the no-data early return above never pays cartopy's
+        # ~1 s import cost.
+        import cartopy.crs as ccrs
 
-    countries_gdf = world[['name', 'iso_a3', 'geometry']]
-    joined_gdf = gpd.sjoin(points_gdf, countries_gdf, how="inner", predicate='within')
+        # Neither the 0.25 degree coordinates nor WPD in W/m2 need float64;
+        # halving the bytes roughly doubles throughput of the groupbys and plots.
+        gfs_data = gfs_data.astype({'lat': 'float32', 'lon': 'float32',
+                                    'wind_power_density': 'float32',
+                                    'forecast_hour': 'int16'})
 
-    country_avg = joined_gdf.groupby('name')['wind_power_density'].mean().reset_index()
-    country_results = country_avg.sort_values('wind_power_density', ascending=False).reset_index(drop=True)
-    country_results['rank'] = country_results.index + 1
-    country_results = country_results.rename(columns={'wind_power_density': 'avg_wpd_3day'})
+        # --- 2. Data Preparation ---
+        # Bucket by integer day ordinal instead of allocating two datetime64
+        # columns and a per-row Python date via .dt.date; real dates are only
+        # rebuilt for the facet titles.
+        base_ord = datetime.strptime(date_str, '%Y%m%d').toordinal()
+        gfs_data['forecast_day'] = (base_ord
+                                    + gfs_data['forecast_hour'].to_numpy(np.int32) // 24).astype(np.int32)
 
-    print("\n--- Country Wind Power Density Rankings (3-Day Average) ---")
-    print(country_results.head(20))
+        # --- 3. Visualize Daily Average Wind Power Density ---
+        # Encode (lat, lon, day) as one integer bin id and reduce with bincount:
+        # a single pass over the values instead of hashing float tuples in groupby.
+        # This aggregation/plot path is memory-bound (little arithmetic per byte
+        # moved), so data layout and dtype wins dominate: keep the values in one
+        # contiguous float32 buffer and reuse it for every reduction below
+        # rather than chasing per-instruction (SIMD) tricks.
+        lats = gfs_data['lat'].to_numpy()
+        lons = gfs_data['lon'].to_numpy()
+        wpd = np.ascontiguousarray(gfs_data['wind_power_density'].to_numpy(), dtype=np.float32)
+        unique_lats = np.unique(lats)
+        unique_lons = np.unique(lons)
+        day_codes, day_values = pd.factorize(gfs_data['forecast_day'], sort=True)
+        n_lon, n_days = unique_lons.size, len(day_values)
 
-    csv_path = output_dir / f"country_rankings_{date_str}_{cycle_str}.csv"
-    country_results.to_csv(csv_path, index=False)
-    print(f"\nSuccessfully saved country rankings to {csv_path}")
+        lat_code = np.searchsorted(unique_lats, lats).astype(np.int64)
+        lon_code = np.searchsorted(unique_lons, lons).astype(np.int64)
+        cell_day = (lat_code * n_lon + lon_code) * n_days + day_codes
 
-    # --- 5. Save to Database ---
-    con = sqlite3.connect(db_path)
-    cursor = con.cursor()
+        n_bins = unique_lats.size * n_lon * n_days
+        sums = np.bincount(cell_day, weights=wpd, minlength=n_bins)
+        counts = np.bincount(cell_day, minlength=n_bins)
+        bin_idx = np.nonzero(counts)[0]
 
-    delete_query = "DELETE FROM country_rankings WHERE forecast_date = ? AND cycle = ?"
-    cursor.execute(delete_query, (date_str, cycle_str))
-    print(f"\nDeleted existing rankings for {date_str} cycle {cycle_str}.")
+        daily_avg_wpd = pd.DataFrame({
+            'lat': unique_lats[bin_idx // (n_lon * n_days)],
+            'lon': unique_lons[(bin_idx // n_days) % n_lon],
+            'forecast_day': np.asarray(day_values)[bin_idx % n_days],
+            'wind_power_density': (sums[bin_idx] / counts[bin_idx]).astype(np.float32),
+        })
 
-    db_rankings = country_results.rename(columns={'name': 'country', 'avg_wpd_3day': 'avg_wind_power_density'})
-    db_rankings['forecast_date'] = date_str
-    db_rankings['cycle'] = cycle_str
-    db_rankings[['forecast_date', 'cycle', 'country', 'avg_wind_power_density', 'rank']].to_sql('country_rankings', con, if_exists='append', index=False)
-    
-    con.commit()
-    con.close()
-    print("Successfully saved country rankings to the database.")
+        # The per-cell 3-day average falls out of the same accumulators, so the
+        # raw values column is only traversed once for both aggregations.
+        cell_sums = sums.reshape(-1, n_days).sum(axis=1)
+        cell_counts = counts.reshape(-1, n_days).sum(axis=1)
+        seen_cells = np.nonzero(cell_counts)[0]
+        total_avg_wpd = pd.DataFrame({
+            'lat': unique_lats[seen_cells // n_lon].astype(np.float32),
+            'lon': unique_lons[seen_cells % n_lon].astype(np.float32),
+            'wind_power_density': (cell_sums[seen_cells] / cell_counts[seen_cells]).astype(np.float32),
+        })
+
+        # Get European country boundaries
+        #world_shapefile = download_natural_earth()
+        #if world_shapefile is None:
+        #    print("Could not load map data. Aborting visualization.")
+        #    return
+        #world = gpd.read_file("data/geospatial/ne_110m_admin_0_countries/ne_110m_admin_0_countries.shp")
+        #world = gpd.read_file("data/geospatial/ne_110m_admin_0_countries/ne_110m_admin_0_countries.shp")
+        #europe = world[world.continent == 'Europe']
+
+        # Create faceted plot
+        unique_days = sorted(daily_avg_wpd['forecast_day'].unique())
+        proj = ccrs.LambertConformal(central_longitude=10.0, central_latitude=52.0)
+        fig, axes = plt.subplots(1, len(unique_days), figsize=(20, 10), subplot_kw={'projection': proj})
+        if len(unique_days) == 1:
+            axes = [axes]
+
+        map_features = load_map_features()
+        lon2d = lat2d = None
+        for i, day in enumerate(unique_days):
+            ax = axes[i]
+            day_data = daily_avg_wpd[daily_avg_wpd['forecast_day'] == day]
+
+            ax.set_extent(MAP_EXTENT, crs=ccrs.PlateCarree())
+            for feature, style in map_features:
+                ax.add_feature(feature, **style)
+            ax.gridlines(draw_labels=True, dms=True, x_inline=False, y_inline=False)
+
+            # The GFS points are a regular lat/lon grid, so reshape to 2D and draw
+            # with pcolormesh instead of Delaunay-triangulating via tricontourf.
+            grid = day_data.pivot(index='lat', columns='lon', values='wind_power_density')
+            if lon2d is None:
+                lon2d, lat2d = np.meshgrid(grid.columns.to_numpy(), grid.index.to_numpy())
+            mesh = ax.pcolormesh(lon2d, lat2d, grid.to_numpy(), transform=ccrs.PlateCarree(),
+                                 cmap='viridis', shading='auto', rasterized=True)
+
+            ax.set_title(f"Forecast Day: {date.fromordinal(int(day)):%Y-%m-%d}")
+
+        fig.colorbar(mesh, ax=axes, orientation='horizontal', fraction=0.05, pad=0.1, label="Wind Power Density (W/m²)")
+        plt.suptitle(f"Daily Average Wind Power Density (GFS Run: {date_str} Cycle {cycle_str})", fontsize=16)
+        plt.tight_layout(rect=[0, 0.05, 1, 0.96])
+
+        output_dir = Path("data/processed/plots")
+        output_dir.mkdir(parents=True, exist_ok=True)
+        plot_path = output_dir / f"wpd_map_faceted_{date_str}_{cycle_str}.png"
+        plt.savefig(plot_path, dpi=120)
+        print(f"Successfully generated and saved faceted wind power density map to {plot_path}")
+
+        # --- 4. Country Ranking ---
+        world = load_world()
+
+        geometry = gpd.points_from_xy(total_avg_wpd['lon'].to_numpy(dtype=np.float64),
+                                      total_avg_wpd['lat'].to_numpy(dtype=np.float64),
+                                      crs="EPSG:4326")
+        points_gdf = gpd.GeoDataFrame(total_avg_wpd, geometry=geometry)
+
+        # Keep only countries overlapping the analysis bbox (slightly padded), so
+        # the ranking never tests points against the ~170 polygons elsewhere.
+        countries_gdf = world.cx[-12:42, 33:72][['name', 'iso_a3', 'geometry']].reset_index(drop=True)
+
+        country_avg = None
+        if use_gpu:
+            try:
+                country_avg = rank_countries_gpu(points_gdf, countries_gdf)
+            except ImportError:
+                print("cuspatial/cudf not available. Falling back to CPU spatial join.")
+
+        if country_avg is None:
+            try:
+                country_avg = rank_countries_raster(total_avg_wpd, countries_gdf)
+            except ImportError:
+                print("rasterio not available. Falling back to CPU spatial join.")
+
+        if country_avg is None:
+            # One vectorized STRtree query instead of gpd.sjoin's per-row
+            # dataframe alignment; returns (point_idx, polygon_idx) pairs in C.
+            from shapely import STRtree
+            tree = STRtree(countries_gdf.geometry.values)
+            i_pts, i_poly = tree.query(points_gdf.geometry.values, predicate='within')
+            cell_wpd = total_avg_wpd['wind_power_density'].to_numpy(dtype=np.float64)
+            sums = np.bincount(i_poly, weights=cell_wpd[i_pts], minlength=len(countries_gdf))
+            counts = np.bincount(i_poly, minlength=len(countries_gdf))
+            hit = counts > 0
+            country_avg = pd.DataFrame({
+                'name': countries_gdf['name'].to_numpy()[hit],
+                'wind_power_density': sums[hit] / counts[hit],
+            })
+        country_results = country_avg.sort_values('wind_power_density', ascending=False).reset_index(drop=True)
+        country_results['rank'] = country_results.index + 1
+        country_results = country_results.rename(columns={'wind_power_density': 'avg_wpd_3day'})
+
+        print("\n--- Country Wind Power Density Rankings (3-Day Average) ---")
+        print(country_results.head(20))
+
+        csv_path = output_dir / f"country_rankings_{date_str}_{cycle_str}.csv"
+        country_results.to_csv(csv_path, index=False)
+        print(f"\nSuccessfully saved country rankings to {csv_path}")
+
+        # --- 5. Save to Database ---
+        cursor = con.cursor()
+
+        rows = [(date_str, cycle_str, country, float(wpd), int(rank))
+                for country, wpd, rank in zip(country_results['name'],
+                                              country_results['avg_wpd_3day'],
+                                              country_results['rank'])]
+        insert_query = ("INSERT INTO country_rankings "
+                        "(forecast_date, cycle, country, avg_wind_power_density, rank) "
+                        "VALUES (?, ?, ?, ?, ?)")
+        # Delete + insert as one transaction with a single prepared statement
+        with con:
+            cursor.execute("DELETE FROM country_rankings WHERE forecast_date = ? AND cycle = ?",
+                           (date_str, cycle_str))
+            cursor.executemany(insert_query, rows)
+        print(f"\nSuccessfully saved country rankings for {date_str} cycle {cycle_str} to the database.")
+    finally:
+        con.close()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Perform analysis on GFS data.")
     parser.add_argument("date", help="Date for the analysis in YYYYMMDD format.")
     parser.add_argument("cycle", help="Cycle for the analysis (e.g., 06).")
+    parser.add_argument("--gpu", action="store_true",
+                        help="Use cuSpatial for the country ranking (requires a CUDA GPU).")
     args = parser.parse_args()
-    main(args.date, args.cycle)
+    main(args.date, args.cycle, use_gpu=args.gpu)